@@ -11,9 +11,86 @@ import asyncio
 import websockets
 import threading
 import argparse
+import logging
 import numpy as np
+from collections import deque
 from typing import List, Tuple, Optional
 
+logger = logging.getLogger(__name__)
+
+# Handle optional numba dependency gracefully
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    logger.info("Numba not available; stroke simplification runs in pure Python (pip install numba)")
+    
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit"""
+        def decorator(func):
+            return func
+        return decorator
+
+
+@njit(cache=True)
+def rdp_int(pts, eps):
+    """Simplify an (N, 2) int32 polyline with iterative Douglas-Peucker"""
+    n = pts.shape[0]
+    if n < 3:
+        return pts.copy()
+    
+    keep = np.zeros(n, np.bool_)
+    keep[0] = True
+    keep[n - 1] = True
+    
+    # Manual stack of (start, end) index ranges still to be examined
+    stack = np.empty((n, 2), np.int64)
+    stack[0, 0] = 0
+    stack[0, 1] = n - 1
+    top = 1
+    
+    while top > 0:
+        top -= 1
+        start = stack[top, 0]
+        end = stack[top, 1]
+        
+        x1 = float(pts[start, 0])
+        y1 = float(pts[start, 1])
+        dx = float(pts[end, 0]) - x1
+        dy = float(pts[end, 1]) - y1
+        norm = np.sqrt(dx * dx + dy * dy)
+        
+        max_dist = 0.0
+        index = start
+        for i in range(start + 1, end):
+            px = float(pts[i, 0]) - x1
+            py = float(pts[i, 1]) - y1
+            if norm > 0.0:
+                dist = abs(dx * py - dy * px) / norm
+            else:
+                dist = np.sqrt(px * px + py * py)
+            if dist > max_dist:
+                max_dist = dist
+                index = i
+        
+        if max_dist > eps:
+            keep[index] = True
+            stack[top, 0] = start
+            stack[top, 1] = index
+            stack[top + 1, 0] = index
+            stack[top + 1, 1] = end
+            top += 2
+    
+    result = np.empty((keep.sum(), 2), np.int32)
+    j = 0
+    for i in range(n):
+        if keep[i]:
+            result[j, 0] = pts[i, 0]
+            result[j, 1] = pts[i, 1]
+            j += 1
+    return result
+
 class SimpleARDemo:
     """Simple AR demo with WebRTC integration"""
     
@@ -33,6 +110,10 @@ class SimpleARDemo:
         self.websocket_loop = None
         self.connected_to_bridge = False
         
+        # Outgoing messages, serialized and sent by the WebSocket thread
+        self._outbox = deque()
+        self._outbox_event = None
+        
         # Drawing system
         self.drawing_lines = []
         self.current_line = []
@@ -55,6 +136,22 @@ class SimpleARDemo:
         self.fps_counter = 0
         self.fps_start_time = time.time()
         self.current_fps = 0.0
+        
+        # Reusable overlay buffer (allocated on first frame)
+        self._out = None
+        
+        # Persistent annotation layer composited onto each frame. Drawn as
+        # numpy arrays; with OpenCL on, device copies (_annot_u/_mask_u) are
+        # kept and re-uploaded only after the layer changes.
+        self._use_opencl = cv2.ocl.haveOpenCL() and cv2.ocl.useOpenCL()
+        self._annot_layer = None
+        self._annot_mask = None
+        self._annot_u = None
+        self._mask_u = None
+        self._annot_dirty = False
+        self._annot_lines_drawn = 0
+        self._annot_reset_pending = False
+        self._current_drawn_upto = 0
     
     def initialize_camera(self):
         """Initialize camera"""
@@ -135,13 +232,20 @@ class SimpleARDemo:
                 
                 print(f"📱 AR client joined room {self.room_id}")
                 
+                # Start the outbox writer
+                self._outbox_event = asyncio.Event()
+                writer_task = asyncio.create_task(self._outbox_writer(websocket))
+                
                 # Listen for messages
-                async for message in websocket:
-                    try:
-                        data = json.loads(message)
-                        await self._handle_bridge_message(data)
-                    except json.JSONDecodeError:
-                        print(f"Invalid JSON from bridge: {message}")
+                try:
+                    async for message in websocket:
+                        try:
+                            data = json.loads(message)
+                            await self._handle_bridge_message(data)
+                        except json.JSONDecodeError:
+                            print(f"Invalid JSON from bridge: {message}")
+                finally:
+                    writer_task.cancel()
                         
         except websockets.exceptions.ConnectionClosed:
             print("🔌 WebRTC bridge connection closed")
@@ -150,6 +254,16 @@ class SimpleARDemo:
             print(f"WebSocket client error: {e}")
             self.connected_to_bridge = False
     
+    async def _outbox_writer(self, websocket):
+        """Serialize and send queued outgoing messages on the WebSocket thread"""
+        while True:
+            await self._outbox_event.wait()
+            self._outbox_event.clear()
+            
+            while self._outbox:
+                message = self._outbox.popleft()
+                await websocket.send(json.dumps(message))
+    
     async def _handle_bridge_message(self, data):
         """Handle messages from WebRTC bridge"""
         message_type = data.get('type')
@@ -164,6 +278,7 @@ class SimpleARDemo:
         elif message_type == 'ar_annotations_clear':
             # Clear all annotations command from platform
             self.drawing_lines.clear()
+            self._annot_reset_pending = True
             print("🗑️  All annotations cleared by platform")
     
     def send_annotation_to_platform(self, annotation_data):
@@ -180,12 +295,10 @@ class SimpleARDemo:
                 'source': 'ar_field_medic'
             }
             
-            # Send via WebSocket (non-blocking)
-            if self.websocket_loop and not self.websocket_loop.is_closed():
-                asyncio.run_coroutine_threadsafe(
-                    self.websocket_connection.send(json.dumps(message)),
-                    self.websocket_loop
-                )
+            # Queue for the WebSocket thread, which does the serialization (non-blocking)
+            if self.websocket_loop and not self.websocket_loop.is_closed() and self._outbox_event:
+                self._outbox.append(message)
+                self.websocket_loop.call_soon_threadsafe(self._outbox_event.set)
                 return True
                 
         except Exception as e:
@@ -199,6 +312,7 @@ class SimpleARDemo:
             # Start drawing
             self.mouse_drawing = True
             self.current_line = [(x, y)]
+            self._current_drawn_upto = 0
             self.last_mouse_pos = (x, y)
             
         elif event == cv2.EVENT_MOUSEMOVE:
@@ -211,16 +325,24 @@ class SimpleARDemo:
             # Finish drawing
             self.mouse_drawing = False
             if len(self.current_line) > 1:
+                # Flush any segments added since the last frame onto the layer
+                self.update_annotation_layer()
+                
+                # Simplify the stroke before storing and sending it
+                points = rdp_int(np.asarray(self.current_line, np.int32), 1.0)
+                
                 # Save the completed line
                 line_data = {
                     'type': 'line_drawing',
-                    'points': self.current_line.copy(),
+                    'points': points.tolist(),
                     'color': self.drawing_color,
                     'thickness': self.drawing_thickness,
                     'drawing_mode': 'field_medic_ar'
                 }
                 
+                # Already drawn incrementally - just commit it to the layer bookkeeping
                 self.drawing_lines.append(line_data)
+                self._annot_lines_drawn += 1
                 
                 # Send annotation to WebRTC platform if connected
                 if self.webrtc_enabled and self.connected_to_bridge:
@@ -228,6 +350,7 @@ class SimpleARDemo:
                         print(f"📤 Sent drawing annotation to platform")
                 
             self.current_line = []
+            self._current_drawn_upto = 0
             self.last_mouse_pos = None
     
     def cycle_drawing_color(self):
@@ -239,6 +362,7 @@ class SimpleARDemo:
         """Clear all drawings"""
         self.drawing_lines.clear()
         self.current_line.clear()
+        self._annot_reset_pending = True
     
     def update_fps(self):
         """Update FPS counter"""
@@ -250,24 +374,63 @@ class SimpleARDemo:
             self.fps_counter = 0
             self.fps_start_time = current_time
     
-    def draw_overlay(self, frame):
-        """Draw the interactive overlay on the frame"""
-        overlay_frame = frame.copy()
+    def init_annotation_layer(self, shape):
+        """Allocate an empty annotation layer and mask for frames of the given shape"""
+        height, width = shape[:2]
+        layer = np.zeros((height, width, 3), np.uint8)
+        mask = np.zeros((height, width), np.uint8)
+        
+        self._annot_layer = layer
+        self._annot_mask = mask
+        self._annot_dirty = True
+        self._annot_lines_drawn = 0
+        self._annot_reset_pending = False
+        self._current_drawn_upto = 0
+    
+    def update_annotation_layer(self):
+        """Render new lines and new segments of the current stroke into the annotation layer"""
+        if self._annot_reset_pending:
+            self.init_annotation_layer(self._out.shape)
         
-        # Draw completed lines
-        for line_data in self.drawing_lines:
-            points = line_data['points']
-            color = line_data['color']
+        lines = self.drawing_lines[self._annot_lines_drawn:]
+        for line_data in lines:
+            points = np.array(line_data['points'], np.int32).reshape(-1, 1, 2)
             thickness = line_data['thickness']
             
-            for i in range(1, len(points)):
-                cv2.line(overlay_frame, points[i-1], points[i], color, thickness)
+            cv2.polylines(self._annot_layer, [points], False, line_data['color'], thickness)
+            cv2.polylines(self._annot_mask, [points], False, 255, thickness)
         
-        # Draw current line being drawn
-        if len(self.current_line) > 1:
-            for i in range(1, len(self.current_line)):
-                cv2.line(overlay_frame, self.current_line[i-1], self.current_line[i], 
-                        self.drawing_color, self.drawing_thickness)
+        if lines:
+            self._annot_lines_drawn += len(lines)
+            self._annot_dirty = True
+        
+        # Draw only the segments added to the current stroke since the last update
+        if len(self.current_line) > self._current_drawn_upto + 1:
+            points = np.array(self.current_line[self._current_drawn_upto:], np.int32).reshape(-1, 1, 2)
+            
+            cv2.polylines(self._annot_layer, [points], False, self.drawing_color, self.drawing_thickness)
+            cv2.polylines(self._annot_mask, [points], False, 255, self.drawing_thickness)
+            self._current_drawn_upto = len(self.current_line) - 1
+            self._annot_dirty = True
+    
+    def draw_overlay(self, frame):
+        """Draw the interactive overlay on the frame"""
+        self.update_annotation_layer()
+        
+        # Composite completed lines from the annotation layer
+        if self._use_opencl:
+            # polylines can't draw onto a UMat, so the layer is drawn on the host
+            # and uploaded only when it changed; the frame itself makes one round trip
+            if self._annot_dirty:
+                self._annot_u = cv2.UMat(self._annot_layer)
+                self._mask_u = cv2.UMat(self._annot_mask)
+                self._annot_dirty = False
+            frame_u = cv2.copyTo(self._annot_u, self._mask_u, cv2.UMat(frame))
+            overlay_frame = frame_u.get()
+        else:
+            # Copy into the preallocated buffer instead of allocating a new frame
+            np.copyto(self._out, frame)
+            overlay_frame = cv2.copyTo(self._annot_layer, self._annot_mask, self._out)
         
         # Draw crosshair at last mouse position when drawing
         if self.mouse_drawing and self.last_mouse_pos:
@@ -309,7 +472,7 @@ class SimpleARDemo:
             cv2.putText(display_frame, f'Lines: {total_lines}', 
                        (10, 160), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
         
-        # Show frame
+        # Show frame (imshow copies internally, so the overlay buffer can be reused)
         cv2.imshow('Simple AR Demo - WebRTC Integration', display_frame)
         
         # Set mouse callback
@@ -323,6 +486,9 @@ class SimpleARDemo:
         if not self.initialize_camera():
             return False
         
+        # Warm up stroke simplification so JIT compilation doesn't stall the first stroke
+        rdp_int(np.zeros((3, 2), np.int32), 1.0)
+        
         # Initialize WebRTC connection if enabled
         if self.webrtc_enabled:
             self.initialize_webrtc_connection()
@@ -352,6 +518,11 @@ class SimpleARDemo:
                     print("❌ Failed to capture frame")
                     break
                 
+                # Allocate the overlay buffer once, sized to the camera frame
+                if self._out is None or self._out.shape != frame.shape:
+                    self._out = np.empty_like(frame)
+                    self.init_annotation_layer(frame.shape)
+                
                 # Update FPS
                 self.update_fps()
                 
@@ -55,9 +55,9 @@ fi
 
 # Check Python dependencies
 echo -e "${YELLOW}🐍 Checking Python dependencies...${NC}"
-if ! python -c "import websockets, aiohttp" &> /dev/null; then
+if ! python -c "import websockets, aiohttp, orjson" &> /dev/null; then
     echo "Installing Python dependencies..."
-    pip install websockets aiohttp python-dotenv requests
+    pip install websockets aiohttp orjson python-dotenv requests
 fi
 
 echo -e "${GREEN}✅ Prerequisites check completed${NC}"
@@ -31,9 +31,9 @@ if [ ! -d "frontend/node_modules" ]; then
 fi
 
 # Check Python dependencies
-if ! python -c "import websockets, aiohttp" &> /dev/null; then
+if ! python -c "import websockets, aiohttp, orjson" &> /dev/null; then
     echo "Installing Python dependencies..."
-    pip install websockets aiohttp python-dotenv requests
+    pip install websockets aiohttp orjson python-dotenv requests
 fi
 
 echo -e "${GREEN}✅ Prerequisites check completed${NC}"
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test the AR demo annotation layer with and without the OpenCL compositing path
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from simple_ar_demo import SimpleARDemo
+
+
+def _make_demo(use_opencl):
+    """Build a demo with an empty annotation layer for 160x120 frames"""
+    cv2.ocl.setUseOpenCL(use_opencl)
+    demo = SimpleARDemo()
+    demo._use_opencl = use_opencl
+
+    frame = np.zeros((120, 160, 3), np.uint8)
+    demo._out = np.empty_like(frame)
+    demo.init_annotation_layer(frame.shape)
+    return demo, frame
+
+
+def _draw_stroke(use_opencl):
+    """Run init -> update -> draw_overlay for one stroke and return the overlay"""
+    demo, frame = _make_demo(use_opencl)
+
+    demo.mouse_callback(cv2.EVENT_LBUTTONDOWN, 10, 10, 0, None)
+    demo.mouse_callback(cv2.EVENT_MOUSEMOVE, 80, 60, 0, None)
+    demo.update_annotation_layer()
+    demo.mouse_callback(cv2.EVENT_MOUSEMOVE, 150, 110, 0, None)
+    demo.mouse_callback(cv2.EVENT_LBUTTONUP, 150, 110, 0, None)
+
+    return demo.draw_overlay(frame)
+
+
+@pytest.mark.skipif(not cv2.ocl.haveOpenCL(), reason="no OpenCL device")
+def test_annotation_layer_with_opencl():
+    """Drawing and compositing must not fail on an OpenCL device"""
+    try:
+        overlay = _draw_stroke(True)
+    finally:
+        cv2.ocl.setUseOpenCL(False)
+
+    assert isinstance(overlay, np.ndarray)
+    assert overlay[60, 80].tolist() == [0, 255, 0]
+
+
+def test_umat_path_matches_cpu_path():
+    """The UMat composite should match the plain numpy composite
+
+    Without an OpenCL device UMat runs on the CPU, so this checks the UMat
+    code path rather than the device.
+    """
+    try:
+        umat_overlay = _draw_stroke(True)
+    finally:
+        cv2.ocl.setUseOpenCL(False)
+    cpu_overlay = _draw_stroke(False)
+
+    assert np.array_equal(umat_overlay, cpu_overlay)
+
+
+def test_layer_uploaded_only_after_changes():
+    """The UMat copies of the layer are reused until something new is drawn"""
+    try:
+        demo, frame = _make_demo(True)
+        demo.draw_overlay(frame)
+        layer_u = demo._annot_u
+
+        demo.draw_overlay(frame)
+        assert demo._annot_u is layer_u
+
+        demo.mouse_callback(cv2.EVENT_LBUTTONDOWN, 10, 10, 0, None)
+        demo.mouse_callback(cv2.EVENT_MOUSEMOVE, 80, 60, 0, None)
+        overlay = demo.draw_overlay(frame)
+        assert demo._annot_u is not layer_u
+        assert overlay[35, 45].tolist() == [0, 255, 0]
+    finally:
+        cv2.ocl.setUseOpenCL(False)
+
+
+if __name__ == "__main__":
+    if cv2.ocl.haveOpenCL():
+        test_annotation_layer_with_opencl()
+    test_umat_path_matches_cpu_path()
+    test_layer_uploaded_only_after_changes()
+    print("✅ Annotation layer tests passed")
@@ -9,6 +9,7 @@ import time
 import asyncio
 import websockets
 import threading
+from collections import deque
 from typing import List, Tuple
 
 class DrawingAnnotationDemo:
@@ -22,6 +23,10 @@ class DrawingAnnotationDemo:
         self.websocket_loop = None
         self.websocket_thread = None
         
+        # Outgoing messages, serialized and sent by the WebSocket thread
+        self._outbox = deque()
+        self._outbox_event = None
+        
         # Mock drawing data
         self.drawing_lines = []
         self.current_color = (0, 255, 0)  # Green
@@ -77,13 +82,20 @@ class DrawingAnnotationDemo:
                 
                 print(f"📱 AR client joined room {self.room_id}")
                 
+                # Start the outbox writer
+                self._outbox_event = asyncio.Event()
+                writer_task = asyncio.create_task(self._outbox_writer(websocket))
+                
                 # Listen for messages
-                async for message in websocket:
-                    try:
-                        data = json.loads(message)
-                        await self._handle_bridge_message(data)
-                    except json.JSONDecodeError:
-                        print(f"Invalid JSON from bridge: {message}")
+                try:
+                    async for message in websocket:
+                        try:
+                            data = json.loads(message)
+                            await self._handle_bridge_message(data)
+                        except json.JSONDecodeError:
+                            print(f"Invalid JSON from bridge: {message}")
+                finally:
+                    writer_task.cancel()
                         
         except websockets.exceptions.ConnectionClosed:
             print("🔌 WebRTC bridge connection closed")
@@ -92,6 +104,16 @@ class DrawingAnnotationDemo:
             print(f"WebSocket client error: {e}")
             self.connected_to_bridge = False
     
+    async def _outbox_writer(self, websocket):
+        """Serialize and send queued outgoing messages on the WebSocket thread"""
+        while True:
+            await self._outbox_event.wait()
+            self._outbox_event.clear()
+            
+            while self._outbox:
+                message = self._outbox.popleft()
+                await websocket.send(json.dumps(message))
+    
     async def _handle_bridge_message(self, data):
         """Handle messages from WebRTC bridge"""
         message_type = data.get('type')
@@ -121,12 +143,10 @@ class DrawingAnnotationDemo:
                 'source': 'ar_field_medic'
             }
             
-            # Send via WebSocket (non-blocking)
-            if self.websocket_loop and not self.websocket_loop.is_closed():
-                asyncio.run_coroutine_threadsafe(
-                    self.websocket_connection.send(json.dumps(message)),
-                    self.websocket_loop
-                )
+            # Queue for the WebSocket thread, which does the serialization (non-blocking)
+            if self.websocket_loop and not self.websocket_loop.is_closed() and self._outbox_event:
+                self._outbox.append(message)
+                self.websocket_loop.call_soon_threadsafe(self._outbox_event.set)
                 return True
                 
         except Exception as e:
@@ -5,11 +5,65 @@ Tests the complete drawing workflow from field medic to surgeon
 """
 
 import asyncio
+import numpy as np
 import websockets
-import json
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 import time
 
+# Use uvloop's faster event loop when available
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+_dumps = orjson.dumps
+
+# Pre-encoded message templates; only the room id and timestamps vary per run
+_JOIN_TPL = (
+    b'{"type":"join_room","roomId":%b,"clientType":"ar_field_medic",'
+    b'"userInfo":{"name":"Test Field Medic","capabilities":["drawing","annotations"]}}'
+)
+_DRAW_TPL = (
+    b'{"type":"annotation","roomId":%b,"annotation":{"type":"draw","data":{"points":['
+    b'{"x":0.1,"y":0.1},{"x":0.2,"y":0.2},{"x":0.3,"y":0.1},{"x":0.4,"y":0.2}],'
+    b'"color":"#00FF00","thickness":3},"timestamp":%f,"source":"field_medic"},"timestamp":%f}'
+)
+
+# Seconds to wait on the backend before giving up, so a hung server fails the test
+_HTTP_TIMEOUT = 10
+
+TEST_CREDENTIALS = {
+    "username": "dr.smith",
+    "password": "SecurePass123!"
+}
+
+# Access tokens by backend URL; kept apart from any HTTP client so each test
+# logs in through its own keep-alive session but only once per run
+_auth_tokens = {}
+
+def get_auth_token(session, backend_url="http://localhost:3001"):
+    """Log in through a requests session once and return the cached access token"""
+    token = _auth_tokens.get(backend_url)
+    if token is None:
+        response = session.post(f"{backend_url}/api/auth/login", json=TEST_CREDENTIALS,
+                                timeout=_HTTP_TIMEOUT)
+        response.raise_for_status()
+        token = _auth_tokens[backend_url] = response.json()["tokens"]["accessToken"]
+    return token
+
+async def get_auth_token_async(client, backend_url="http://localhost:3001"):
+    """Log in through an httpx.AsyncClient once and return the cached access token"""
+    token = _auth_tokens.get(backend_url)
+    if token is None:
+        response = await client.post(f"{backend_url}/api/auth/login", json=TEST_CREDENTIALS,
+                                     timeout=_HTTP_TIMEOUT)
+        response.raise_for_status()
+        token = _auth_tokens[backend_url] = response.json()["tokens"]["accessToken"]
+    return token
+
 class DrawingSystemTester:
     def __init__(self, backend_url="http://localhost:3001", bridge_url="ws://localhost:8765"):
         self.backend_url = backend_url
@@ -17,6 +71,11 @@ class DrawingSystemTester:
         self.token = None
         self.room_id = None
         
+        # Shared keep-alive HTTP session for all backend calls
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        
     async def test_complete_drawing_workflow(self):
         """Test the complete drawing workflow"""
         print("🧪 Testing Complete Drawing Workflow")
@@ -52,22 +111,14 @@ class DrawingSystemTester:
     def login(self):
         """Login to get authentication token"""
         try:
-            response = requests.post(f"{self.backend_url}/api/auth/login", json={
-                "username": "dr.smith",
-                "password": "SecurePass123!"
-            })
-            
-            if response.status_code == 200:
-                data = response.json()
-                print(f"Login response: {data}")
-                tokens = data.get("tokens", {})
-                self.token = tokens.get("accessToken")
-                return True
-            else:
-                print(f"Login failed: {response.status_code}")
-                print(f"Response: {response.text}")
-                return False
+            self.token = get_auth_token(self.session, self.backend_url)
+            self.session.headers["Authorization"] = f"Bearer {self.token}"
+            return True
                 
+        except requests.HTTPError as e:
+            print(f"Login failed: {e.response.status_code}")
+            print(f"Response: {e.response.text}")
+            return False
         except Exception as e:
             print(f"Login error: {e}")
             return False
@@ -75,10 +126,9 @@ class DrawingSystemTester:
     def create_room(self):
         """Create a consultation room"""
         try:
-            headers = {"Authorization": f"Bearer {self.token}"}
-            response = requests.post(f"{self.backend_url}/api/rooms/create", 
-                                   headers=headers,
-                                   json={"type": "ar-consultation"})
+            response = self.session.post(f"{self.backend_url}/api/rooms/create", 
+                                       json={"type": "ar-consultation"},
+                                       timeout=_HTTP_TIMEOUT)
             
             if response.status_code == 201:
                 data = response.json()
@@ -96,53 +146,23 @@ class DrawingSystemTester:
     
     async def test_drawing_bridge(self):
         """Test drawing through the WebRTC bridge"""
+        # One clock read for the whole test; messages get 1ms-spaced offsets for ordering
+        now = time.time()
+        
         try:
-            # Connect to bridge
-            ws = await websockets.connect(self.bridge_url)
+            # Connect to bridge (no deflate or keepalive pings for this short local test)
+            ws = await websockets.connect(
+                self.bridge_url, compression=None, max_size=2**20, ping_interval=None
+            )
             print("🔗 Connected to WebRTC bridge")
             
             # Join room as field medic
-            join_message = {
-                "type": "join_room",
-                "roomId": self.room_id,
-                "clientType": "ar_field_medic",
-                "userInfo": {
-                    "name": "Test Field Medic",
-                    "capabilities": ["drawing", "annotations"]
-                }
-            }
-            await ws.send(json.dumps(join_message))
+            room_id = _dumps(self.room_id)
+            await ws.send(_JOIN_TPL % room_id)
             print("👥 Joined room as field medic")
             
-            # Send test drawing annotation
-            drawing_annotation = {
-                "type": "annotation",
-                "roomId": self.room_id,
-                "annotation": {
-                    "type": "draw",
-                    "data": {
-                        "points": [
-                            {"x": 0.1, "y": 0.1},
-                            {"x": 0.2, "y": 0.2},
-                            {"x": 0.3, "y": 0.1},
-                            {"x": 0.4, "y": 0.2}
-                        ],
-                        "color": "#00FF00",
-                        "thickness": 3
-                    },
-                    "timestamp": time.time(),
-                    "source": "field_medic"
-                },
-                "timestamp": time.time()
-            }
-            
-            await ws.send(json.dumps(drawing_annotation))
-            print("📍 Sent test drawing annotation")
-            
-            # Wait for response or confirmation
-            await asyncio.sleep(1)
-            
-            # Send another test drawing
+            # Build both test drawings up front so they go out back-to-back
+            drawing_annotation = _DRAW_TPL % (room_id, now, now)
             circle_drawing = {
                 "type": "annotation",
                 "roomId": self.room_id,
@@ -153,15 +173,19 @@ class DrawingSystemTester:
                         "color": "#FF0000",
                         "thickness": 2
                     },
-                    "timestamp": time.time(),
+                    "timestamp": now + 1e-3,
                     "source": "field_medic"
                 },
-                "timestamp": time.time()
+                "timestamp": now + 1e-3
             }
             
-            await ws.send(json.dumps(circle_drawing))
+            await ws.send(drawing_annotation)
+            print("📍 Sent test drawing annotation")
+            
+            await ws.send(_dumps(circle_drawing))
             print("🔴 Sent circle drawing annotation")
             
+            # close() flushes queued frames before the closing handshake
             await ws.close()
             print("✅ Bridge drawing test completed successfully")
             return True
@@ -172,14 +196,17 @@ class DrawingSystemTester:
     
     def generate_circle_points(self, center_x, center_y, radius, num_points=20):
         """Generate points for a circle drawing"""
-        import math
-        points = []
-        for i in range(num_points + 1):
-            angle = 2 * math.pi * i / num_points
-            x = center_x + radius * math.cos(angle)
-            y = center_y + radius * math.sin(angle)
-            points.append({"x": x, "y": y})
-        return points
+        # Rotation recurrence: every point is the previous one rotated by dtheta,
+        # so only one cos/sin pair is evaluated regardless of num_points
+        dtheta = 2 * np.pi / num_points
+        steps = np.full(num_points + 1, complex(np.cos(dtheta), np.sin(dtheta)))
+        steps[0] = 1
+        offsets = radius * np.cumprod(steps)
+        xs = center_x + offsets.real
+        ys = center_y + offsets.imag
+        
+        # Convert to the list-of-dicts wire format only at the JSON boundary
+        return [{"x": x, "y": y} for x, y in zip(xs.tolist(), ys.tolist())]
 
 async def main():
     """Main test function"""
@@ -205,4 +232,6 @@ async def main():
     return success
 
 if __name__ == "__main__":
+    if UVLOOP_AVAILABLE:
+        uvloop.install()
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test the WebRTC-AR bridge's client bookkeeping, annotation queue and framing
+"""
+
+import asyncio
+import json
+
+from webrtc_ar_bridge import WebRTCARBridge, _VIDEO_FRAME_TYPE, _VIDEO_HDR
+
+
+def _assert_clients_consistent(bridge):
+    """_ar_ids, _ar_ws and _ar_index must describe the same slots"""
+    assert len(bridge._ar_ids) == len(bridge._ar_ws) == len(bridge._ar_index)
+    for slot, client_id in enumerate(bridge._ar_ids):
+        assert bridge._ar_index[client_id] == slot
+        assert bridge._ar_ws[slot] == f"ws-{client_id}"
+
+
+def test_remove_ar_client_keeps_slots_consistent():
+    """Removing the first, middle or last client patches the moved slot"""
+    for removed in ([1], [3], [5], [3, 1, 5, 2, 4]):
+        bridge = WebRTCARBridge()
+        for client_id in range(1, 6):
+            bridge._add_ar_client(client_id, f"ws-{client_id}")
+
+        for client_id in removed:
+            bridge._remove_ar_client(client_id)
+            _assert_clients_consistent(bridge)
+            assert client_id not in bridge._ar_index
+
+        assert sorted(bridge._ar_ids) == sorted(set(range(1, 6)) - set(removed))
+
+    # Removing an unknown client is a no-op
+    bridge = WebRTCARBridge()
+    bridge._add_ar_client(1, "ws-1")
+    bridge._remove_ar_client(99)
+    _assert_clients_consistent(bridge)
+
+
+def test_queue_overflow_drops_oldest():
+    """A full queue drops its oldest annotation and counts the drop"""
+    async def scenario():
+        bridge = WebRTCARBridge(max_queued_annotations=2)
+        for n in range(3):
+            bridge._queue_outgoing({'n': n})
+
+        queue = bridge.outgoing_annotations
+        assert bridge.stats['annotations_dropped'] == 1
+        assert [queue.get_nowait()['n'] for _ in range(queue.qsize())] == [1, 2]
+
+        # The dropped item was marked done, so only the two taken above are outstanding
+        queue.task_done()
+        queue.task_done()
+        await asyncio.wait_for(queue.join(), 1)
+
+    asyncio.run(scenario())
+
+
+def test_batches_never_exceed_max_batch_size():
+    """Queued annotations are sent in batches of at most max_batch_size"""
+    async def scenario():
+        bridge = WebRTCARBridge(batch_annotations=True, batch_window_ms=1, max_batch_size=3)
+        sizes = []
+
+        async def send_one(annotation):
+            sizes.append(1)
+
+        async def send_batch(annotations):
+            sizes.append(len(annotations))
+
+        bridge.send_annotation_to_webrtc = send_one
+        bridge.send_annotation_batch_to_webrtc = send_batch
+
+        for n in range(8):
+            bridge._queue_outgoing({'n': n})
+
+        bridge.is_running = True
+        worker = asyncio.create_task(bridge.process_annotation_queues())
+        await asyncio.wait_for(bridge.outgoing_annotations.join(), 1)
+        bridge.is_running = False
+        worker.cancel()
+
+        assert sum(sizes) == 8
+        assert max(sizes) <= 3
+
+    asyncio.run(scenario())
+
+
+def test_binary_video_frame_header():
+    """The binary header is decoded and the payload kept without copying"""
+    bridge = WebRTCARBridge()
+    payload = bytes(range(16))
+    message = _VIDEO_HDR.pack(_VIDEO_FRAME_TYPE, 42, 1_700_000_000_123) + payload
+
+    bridge.handle_ar_video_frame(7, message)
+
+    session_id, ts, frame = bridge.latest_video_frames[7]
+    assert (session_id, ts) == (42, 1_700_000_000_123)
+    assert frame.tobytes() == payload
+    assert bridge.stats['frames_processed'] == 1
+
+
+def test_truncated_video_frame_is_rejected():
+    """A frame shorter than the header is dropped"""
+    bridge = WebRTCARBridge()
+    message = _VIDEO_HDR.pack(_VIDEO_FRAME_TYPE, 42, 1)[:-1]
+
+    bridge.handle_ar_video_frame(7, message)
+
+    assert 7 not in bridge.latest_video_frames
+    assert bridge.stats['frames_processed'] == 0
+
+
+def test_welcome_message_is_valid_json():
+    """The cached welcome prefix plus the client id is a complete JSON object"""
+    bridge = WebRTCARBridge()
+    assert json.loads(bridge._welcome_prefix() + b'%d}' % 3) == {
+        'type': 'connected', 'room_id': None, 'session_id': None, 'client_id': 3
+    }
+
+    # A new room or session rebuilds the prefix
+    bridge.current_room_id = 'room-"1"'
+    bridge.ar_session_id = 'session-1'
+    assert json.loads(bridge._welcome_prefix() + b'%d}' % 4) == {
+        'type': 'connected', 'room_id': 'room-"1"', 'session_id': 'session-1', 'client_id': 4
+    }
+
+
+if __name__ == "__main__":
+    test_remove_ar_client_keeps_slots_consistent()
+    test_queue_overflow_drops_oldest()
+    test_batches_never_exceed_max_batch_size()
+    test_binary_video_frame_header()
+    test_truncated_video_frame_is_rejected()
+    test_welcome_message_is_valid_json()
+    print("✅ AR bridge tests passed")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test the WebRTC-AR bridge's video frame forwarding
+"""
+
+import asyncio
+
+import orjson
+from aiohttp.test_utils import TestClient, TestServer
+
+from webrtc_bridge import CallState, WebRTCARBridge, _embedded_room_id
+
+FRAME = '{"type":"video_frame","roomId":"room-a","frameData":"AAAA","timestamp":1.0}'
+OTHER_ROOM_FRAME = '{"type":"video_frame","roomId":"room-b","frameData":"BBBB","timestamp":2.0}'
+# Key order that misses the raw prefix check and takes the parsed path
+PARSED_FRAME = '{"roomId":"room-a","type":"video_frame","frameData":"CCCC","timestamp":3.0}'
+
+
+def _bridge_with_calls(call_rooms):
+    """Build a bridge with active calls in call_rooms that records its notifications"""
+    bridge = WebRTCARBridge(webrtc_url="http://localhost:3001")
+    for room_id in call_rooms:
+        bridge.active_video_calls[room_id] = CallState(surgeon_id=None, start_time=0.0)
+
+    sent = []
+
+    async def capture(event_type, data):
+        sent.append((event_type, data))
+
+    bridge.notify_webrtc_platform = capture
+    return bridge, sent
+
+
+async def _send_frames(bridge, rooms, frames):
+    """Join rooms over a real AR socket, send frames and return the flushed batch"""
+    async with TestClient(TestServer(await bridge.setup_http_server())) as client:
+        websocket = await client.ws_connect('/')
+        for room_id in rooms:
+            await websocket.send_str(orjson.dumps({'type': 'join_room', 'roomId': room_id}).decode())
+        for frame in frames:
+            if isinstance(frame, bytes):
+                await websocket.send_bytes(frame)
+            else:
+                await websocket.send_str(frame)
+        await websocket.close()
+    await bridge.drain_frame_notifications()
+
+
+def _batches(sent):
+    """Decode every video_frame_batch notification"""
+    return [orjson.loads(data) for event_type, data in sent if event_type == 'video_frame_batch']
+
+
+def test_embedded_room_id():
+    """The roomId is read from the message head without decoding the frame"""
+    assert _embedded_room_id(FRAME) == 'room-a'
+    assert _embedded_room_id(FRAME.encode()) == 'room-a'
+    assert _embedded_room_id('{"type": "video_frame", "roomId" : "r 1", "frameData": ""}') == 'r 1'
+    assert _embedded_room_id('{"type":"video_frame","frameData":"AAAA"}') is None
+    assert _embedded_room_id('{"type":"video_frame","roomId":null}') is None
+    assert _embedded_room_id('{"type":"video_frame","roomId":"a\\"b"}') is None
+
+
+def test_frame_from_room_without_call_is_not_forwarded():
+    """A call in another joined room must not let this room's frames through"""
+    async def scenario():
+        bridge, sent = _bridge_with_calls({'room-a'})
+        await _send_frames(bridge, ['room-a', 'room-b'], [OTHER_ROOM_FRAME, FRAME])
+        assert _batches(sent) == [[orjson.loads(FRAME)]]
+
+    asyncio.run(scenario())
+
+
+def test_raw_and_parsed_frames_share_one_shape():
+    """Raw and parsed frames both appear in the batch as the client sent them"""
+    async def scenario():
+        bridge, sent = _bridge_with_calls({'room-a'})
+        await _send_frames(bridge, ['room-a'], [FRAME, FRAME.encode(), PARSED_FRAME])
+        assert _batches(sent) == [[orjson.loads(FRAME), orjson.loads(FRAME), orjson.loads(PARSED_FRAME)]]
+
+    asyncio.run(scenario())
+
+
+def test_pending_frames_are_flushed_on_shutdown():
+    """Frames still waiting for the timer are sent when the bridge drains"""
+    async def scenario():
+        bridge, sent = _bridge_with_calls({'room-a'})
+        bridge.forward_video_frame_raw('room-a', FRAME)
+        assert bridge._flush_handle is not None
+        await bridge.drain_frame_notifications()
+
+        assert _batches(sent) == [[orjson.loads(FRAME)]]
+        assert bridge._pending_frames == []
+        assert bridge._flush_handle is None
+
+    asyncio.run(scenario())
+
+
+def test_ar_websocket_only_on_client_paths():
+    """AR clients connect on / or /ar; unknown GET paths are 404s"""
+    async def scenario():
+        bridge = WebRTCARBridge(webrtc_url="http://localhost:3001")
+        async with TestClient(TestServer(await bridge.setup_http_server())) as client:
+            for path in ('/', '/ar'):
+                websocket = await client.ws_connect(path)
+                await websocket.close()
+            response = await client.get('/no-such-path')
+            assert response.status == 404
+            response = await client.options('/video-call/start')
+            assert response.headers['Access-Control-Allow-Origin'] == '*'
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_embedded_room_id()
+    test_frame_from_room_without_call_is_not_forwarded()
+    test_raw_and_parsed_frames_share_one_shape()
+    test_pending_frames_are_flushed_on_shutdown()
+    test_ar_websocket_only_on_client_paths()
+    print("✅ Bridge frame forwarding tests passed")
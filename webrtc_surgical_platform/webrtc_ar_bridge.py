@@ -6,16 +6,42 @@ Enables real-time annotation synchronization between doctor (web) and field medi
 """
 
 import asyncio
+import collections
+import itertools
 import websockets
-import json
+import msgspec
 import logging
-import threading
+import struct
 import time
-import queue
-import numpy as np
-from typing import Dict, List, Optional, Callable, Any
+import types
+from typing import Dict, List, Mapping, Optional, Callable, Any
 import socketio
 
+# Use uvloop's faster event loop when available
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+# Outbound messages are encoded to UTF-8 JSON bytes and sent as binary frames;
+# AR clients decode them with json.loads, which accepts bytes. Hot-path sends
+# serialize into pooled bytearrays instead of fresh bytes objects
+_json_encoder = msgspec.json.Encoder()
+
+# Binary video frames from AR clients: type_id u8 | session_id u32 | ts u64 | payload.
+# JSON control messages always start with '{', so the type_id never collides.
+_VIDEO_FRAME_TYPE = 0x01
+_VIDEO_HDR = struct.Struct('<BIQ')
+
+
+class ARMsg(msgspec.Struct):
+    """Typed envelope for messages received from AR clients"""
+    type: str
+    data: dict = {}
+    clear_type: str = 'all'
+
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, 
@@ -28,37 +54,74 @@ class WebRTCARBridge:
     def __init__(self, 
                  webrtc_server_url: str = 'http://localhost:3001',
                  ar_ws_port: int = 8765,
-                 auth_token: str = None):
+                 auth_token: str = None,
+                 batch_annotations: bool = False,
+                 batch_window_ms: float = 5,
+                 max_batch_size: int = 64,
+                 max_queued_annotations: int = 512):
         
         self.webrtc_server_url = webrtc_server_url
         self.ar_ws_port = ar_ws_port
         self.auth_token = auth_token
+        
+        # Coalesce bursts of outgoing annotations into one 'ar-annotation-add-batch'
+        # emit (requires a matching handler on the signaling server)
+        self.batch_annotations = batch_annotations
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch_size = max_batch_size
         self.logger = logging.getLogger(__name__)
+        # Checked once; per-message debug logs are skipped outright when disabled
+        self._debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
+        
+        # Decoder for AR client messages, built once
+        self._decoder = msgspec.json.Decoder(ARMsg)
+        
+        # AR message type -> bound handler, built once
+        self._ar_handlers = {
+            'annotation': self._h_annotation,
+            'video_frame': self._h_video,
+            'ping': self._h_ping,
+            'clear_annotations': self._h_clear
+        }
         
         # Connection management
         self.webrtc_client = None
         self.ar_websocket_server = None
-        self.ar_clients = {}  # client_id -> websocket
+        # AR clients as parallel id/websocket lists so broadcasts walk a plain list;
+        # _ar_index maps client_id -> slot for targeted sends and removal
+        self._ar_ids: List[int] = []
+        self._ar_ws: List[Any] = []
+        self._ar_index: Dict[int, int] = {}
+        self._next_client_id = itertools.count(1)  # monotonic int client ids
+        self.latest_video_frames = {}  # client_id -> (session_id, ts, frame view)
+        self._buf_pool = collections.deque(maxlen=32)  # reusable outbound buffers
         self.is_running = False
         
         # Room and session management
         self.current_room_id = None
         self.ar_session_id = None
+        self._welcome_key = None  # (room_id, session_id) the cached welcome was built for
+        self._welcome_bytes = b''
         self.field_medic_connected = False
         self.doctor_connected = False
         
-        # Annotation queues for bidirectional sync
-        self.incoming_annotations = queue.Queue()  # From WebRTC to AR
-        self.outgoing_annotations = queue.Queue()  # From AR to WebRTC
+        # Outgoing annotation queue
+        # Bounded so a slow WebRTC link can't grow memory without limit; the
+        # oldest annotation is dropped on overflow
+        self.outgoing_annotations = asyncio.Queue(maxsize=max_queued_annotations)  # From AR to WebRTC
         
         # Performance tracking
         self.stats = {
             'annotations_sent': 0,
             'annotations_received': 0,
             'frames_processed': 0,
+            'annotations_dropped': 0,
             'connection_uptime': 0,
             'start_time': time.time()
         }
+        # get_stats() refreshes this dict in place and hands out a read-only view
+        self._stats_view: Dict[str, Any] = {}
+        self._stats_proxy = types.MappingProxyType(self._stats_view)
         
         # Initialize WebRTC client
         self.setup_webrtc_client()
@@ -85,16 +148,16 @@ class WebRTCARBridge:
         @self.webrtc_client.event
         async def ar_annotation(data):
             """Handle incoming annotations from doctor"""
-            self.logger.debug(f"Received annotation from doctor: {data['annotation']['type']}")
+            if self._debug_enabled:
+                self.logger.debug("Received annotation from doctor: %s", data['annotation']['type'])
             self.stats['annotations_received'] += 1
             
             # Forward to AR system
             await self.send_to_ar_clients({
                 'type': 'annotation',
                 'data': data['annotation'],
-                'source': 'doctor',
-                'timestamp': time.time()
-            })
+                'source': 'doctor'
+            }, now=time.time())
         
         @self.webrtc_client.event
         async def ar_session_created(data):
@@ -188,36 +251,37 @@ class WebRTCARBridge:
         self.logger.info(f"Starting AR WebSocket server on port {self.ar_ws_port}")
         
         async def handle_ar_client(websocket, path):
-            client_id = f"ar_client_{int(time.time())}_{id(websocket)}"
-            self.ar_clients[client_id] = websocket
+            client_id = next(self._next_client_id)
+            self._add_ar_client(client_id, websocket)
             self.field_medic_connected = True
             
             self.logger.info(f"AR client connected: {client_id}")
             
             try:
                 # Send welcome message
-                await websocket.send(json.dumps({
-                    'type': 'connected',
-                    'client_id': client_id,
-                    'room_id': self.current_room_id,
-                    'session_id': self.ar_session_id
-                }))
+                await websocket.send(self._welcome_prefix() + b'%d}' % client_id)
                 
                 # Handle messages from AR client
                 async for message in websocket:
+                    # Binary video frames bypass JSON entirely
+                    if (isinstance(message, (bytes, bytearray))
+                            and message and message[0] == _VIDEO_FRAME_TYPE):
+                        self.handle_ar_video_frame(client_id, message)
+                        continue
                     try:
-                        data = json.loads(message)
+                        data = self._decoder.decode(message)
                         await self.handle_ar_message(client_id, data)
-                    except json.JSONDecodeError:
-                        self.logger.error(f"Invalid JSON from AR client {client_id}")
+                    except msgspec.DecodeError as e:
+                        self.logger.error(f"Invalid message from AR client {client_id}: {e}")
             
             except websockets.exceptions.ConnectionClosed:
                 self.logger.info(f"AR client disconnected: {client_id}")
             except Exception as e:
                 self.logger.error(f"Error handling AR client {client_id}: {e}")
             finally:
-                self.ar_clients.pop(client_id, None)
-                if not self.ar_clients:
+                self._remove_ar_client(client_id)
+                self.latest_video_frames.pop(client_id, None)
+                if not self._ar_ws:
                     self.field_medic_connected = False
         
         # Start WebSocket server
@@ -230,6 +294,22 @@ class WebRTCARBridge:
         self.logger.info(f"AR WebSocket server started on ws://localhost:{self.ar_ws_port}")
         await server.wait_closed()
     
+    def _welcome_prefix(self) -> bytes:
+        """Serialized 'connected' envelope up to the client_id value
+        
+        Rebuilt only when the room or AR session changes; each connect just
+        appends the client id.
+        """
+        key = (self.current_room_id, self.ar_session_id)
+        if key != self._welcome_key:
+            self._welcome_key = key
+            self._welcome_bytes = _json_encoder.encode({
+                'type': 'connected',
+                'room_id': self.current_room_id,
+                'session_id': self.ar_session_id
+            })[:-1] + b',"client_id":'
+        return self._welcome_bytes
+    
     async def connect_to_webrtc(self):
         """Connect to WebRTC signaling server"""
         try:
@@ -261,34 +341,62 @@ class WebRTCARBridge:
                 }
             })
     
-    async def handle_ar_message(self, client_id: str, data: Dict[str, Any]):
+    async def handle_ar_message(self, client_id: int, data: ARMsg):
         """Handle messages from AR client"""
-        message_type = data.get('type')
-        
-        if message_type == 'annotation':
-            # Forward annotation to WebRTC platform
-            await self.send_annotation_to_webrtc(data['data'])
-            
-        elif message_type == 'video_frame':
-            # Handle video frame data (for future video streaming)
-            self.stats['frames_processed'] += 1
-            
-        elif message_type == 'ping':
-            # Respond to ping
-            await self.send_to_ar_client(client_id, {
-                'type': 'pong',
-                'timestamp': time.time()
+        handler = self._ar_handlers.get(data.type)
+        if handler:
+            await handler(client_id, data)
+        else:
+            self.logger.warning(f"Unknown message type from AR client: {data.type}")
+    
+    async def _h_annotation(self, client_id: int, data: ARMsg):
+        # Queue annotation for forwarding to WebRTC platform
+        self._queue_outgoing(data.data)
+    
+    def _queue_outgoing(self, annotation: Dict[str, Any]):
+        """Queue an outgoing annotation, dropping the oldest one when full"""
+        q = self.outgoing_annotations
+        try:
+            q.put_nowait(annotation)
+        except asyncio.QueueFull:
+            q.get_nowait()
+            q.task_done()
+            q.put_nowait(annotation)
+            self.stats['annotations_dropped'] += 1
+    
+    async def _h_video(self, client_id: int, data: ARMsg):
+        # Handle video frame data (for future video streaming)
+        self.stats['frames_processed'] += 1
+    
+    async def _h_ping(self, client_id: int, data: ARMsg):
+        # Respond to ping
+        await self.send_to_ar_client(client_id, {
+            'type': 'pong',
+            'timestamp': time.time()
+        })
+    
+    async def _h_clear(self, client_id: int, data: ARMsg):
+        # Forward clear request to WebRTC
+        if self.ar_session_id:
+            await self.webrtc_client.emit('ar-annotations-clear', {
+                'clearType': data.clear_type
             })
-            
-        elif message_type == 'clear_annotations':
-            # Forward clear request to WebRTC
-            if self.ar_session_id:
-                await self.webrtc_client.emit('ar-annotations-clear', {
-                    'clearType': data.get('clear_type', 'all')
-                })
+    
+    def handle_ar_video_frame(self, client_id: int, message: bytes):
+        """Handle a binary video frame without copying the payload"""
+        if len(message) < _VIDEO_HDR.size:
+            self.logger.error(f"Truncated video frame from AR client {client_id}")
+            return
         
-        else:
-            self.logger.warning(f"Unknown message type from AR client: {message_type}")
+        # numpy is only needed once video frames arrive, so keep it off the import path
+        import numpy as np
+        
+        mv = memoryview(message)
+        _, session_id, ts = _VIDEO_HDR.unpack_from(mv)
+        frame = np.frombuffer(mv[_VIDEO_HDR.size:], dtype=np.uint8)
+        
+        self.latest_video_frames[client_id] = (session_id, ts, frame)
+        self.stats['frames_processed'] += 1
     
     async def send_annotation_to_webrtc(self, annotation_data: Dict[str, Any]):
         """Send annotation from AR to WebRTC platform"""
@@ -297,54 +405,122 @@ class WebRTCARBridge:
             return
         
         try:
-            await self.webrtc_client.emit('ar-annotation-add', {
-                'type': annotation_data.get('type', 'draw'),
-                'data': annotation_data.get('data', {}),
-                'metadata': {
-                    'source': 'field_medic',
-                    'timestamp': time.time(),
-                    **annotation_data.get('metadata', {})
-                }
-            })
+            await self.webrtc_client.emit(
+                'ar-annotation-add', self._build_annotation_payload(annotation_data, time.time())
+            )
             
             self.stats['annotations_sent'] += 1
-            self.logger.debug(f"Sent annotation to WebRTC: {annotation_data.get('type')}")
+            if self._debug_enabled:
+                self.logger.debug("Sent annotation to WebRTC: %s", annotation_data.get('type'))
             
         except Exception as e:
             self.logger.error(f"Failed to send annotation to WebRTC: {e}")
     
-    async def send_to_ar_clients(self, data: Dict[str, Any]):
-        """Send message to all connected AR clients"""
-        if not self.ar_clients:
+    async def send_annotation_batch_to_webrtc(self, annotations: List[Dict[str, Any]]):
+        """Send several annotations from AR to WebRTC platform in one event"""
+        if not self.doctor_connected or not self.ar_session_id:
+            self.logger.warning("Cannot send annotations: not connected to WebRTC or no AR session")
             return
         
-        message = json.dumps(data)
-        disconnected_clients = []
+        try:
+            now = time.time()
+            await self.webrtc_client.emit('ar-annotation-add-batch', {
+                'items': [self._build_annotation_payload(a, now) for a in annotations]
+            })
+            
+            self.stats['annotations_sent'] += len(annotations)
+            if self._debug_enabled:
+                self.logger.debug("Sent batch of %d annotations to WebRTC", len(annotations))
+            
+        except Exception as e:
+            self.logger.error(f"Failed to send annotation batch to WebRTC: {e}")
+    
+    def _build_annotation_payload(self, annotation_data: Dict[str, Any], timestamp: float) -> Dict[str, Any]:
+        """Build the 'ar-annotation-add' payload for one AR annotation"""
+        return {
+            'type': annotation_data.get('type', 'draw'),
+            'data': annotation_data.get('data', {}),
+            'metadata': {
+                'source': 'field_medic',
+                'timestamp': timestamp,
+                **annotation_data.get('metadata', {})
+            }
+        }
+    
+    def _add_ar_client(self, client_id: int, websocket):
+        """Register an AR client in the next free slot"""
+        self._ar_index[client_id] = len(self._ar_ids)
+        self._ar_ids.append(client_id)
+        self._ar_ws.append(websocket)
+    
+    def _remove_ar_client(self, client_id: int):
+        """Remove an AR client by moving the last slot into its place"""
+        index = self._ar_index.pop(client_id, None)
+        if index is None:
+            return
         
-        for client_id, websocket in self.ar_clients.items():
-            try:
-                await websocket.send(message)
-            except websockets.exceptions.ConnectionClosed:
-                disconnected_clients.append(client_id)
-            except Exception as e:
-                self.logger.error(f"Failed to send to AR client {client_id}: {e}")
-                disconnected_clients.append(client_id)
+        last_id = self._ar_ids.pop()
+        last_ws = self._ar_ws.pop()
+        if last_id != client_id:
+            self._ar_ids[index] = last_id
+            self._ar_ws[index] = last_ws
+            self._ar_index[last_id] = index
+    
+    async def send_to_ar_clients(self, data: Dict[str, Any], now: Optional[float] = None):
+        """Send message to all connected AR clients
+        
+        When now is given it is stamped as the message timestamp, so the clock
+        is read once per broadcast by the caller rather than per client.
+        """
+        if not self._ar_ws:
+            return
         
-        # Clean up disconnected clients
+        if now is not None:
+            data['timestamp'] = now
+        
+        # Encode once into a pooled buffer; broadcast() writes the same frame to
+        # every open connection synchronously, so the buffer is free right after
+        buf = self._acquire_buf()
+        try:
+            _json_encoder.encode_into(data, buf)
+            websockets.broadcast(self._ar_ws, buf)
+        finally:
+            self._release_buf(buf)
+        
+        # broadcast() skips closed sockets silently; sweep them here in case the
+        # client handler hasn't unregistered them yet
+        disconnected_clients = [
+            client_id for client_id, websocket in zip(self._ar_ids, self._ar_ws)
+            if websocket.closed
+        ]
         for client_id in disconnected_clients:
-            self.ar_clients.pop(client_id, None)
+            self._remove_ar_client(client_id)
         
         if disconnected_clients:
             self.logger.info(f"Removed {len(disconnected_clients)} disconnected AR clients")
     
-    async def send_to_ar_client(self, client_id: str, data: Dict[str, Any]):
+    def _acquire_buf(self) -> bytearray:
+        """Take a serialization buffer from the pool, allocating only when empty"""
+        return self._buf_pool.pop() if self._buf_pool else bytearray(4096)
+    
+    def _release_buf(self, buf: bytearray):
+        """Return a buffer to the pool once the send using it has completed"""
+        self._buf_pool.append(buf)
+    
+    async def send_to_ar_client(self, client_id: int, data: Dict[str, Any]):
         """Send message to specific AR client"""
-        websocket = self.ar_clients.get(client_id)
-        if websocket:
+        index = self._ar_index.get(client_id)
+        if index is not None:
+            websocket = self._ar_ws[index]
             try:
-                await websocket.send(json.dumps(data))
+                buf = self._acquire_buf()
+                try:
+                    _json_encoder.encode_into(data, buf)
+                    await websocket.send(buf)
+                finally:
+                    self._release_buf(buf)
             except websockets.exceptions.ConnectionClosed:
-                self.ar_clients.pop(client_id, None)
+                self._remove_ar_client(client_id)
                 self.logger.info(f"Removed disconnected AR client: {client_id}")
             except Exception as e:
                 self.logger.error(f"Failed to send to AR client {client_id}: {e}")
@@ -352,18 +528,31 @@ class WebRTCARBridge:
     async def process_annotation_queues(self):
         """Process annotation queues for bidirectional sync"""
         while self.is_running:
+            # Block until a producer queues an outgoing annotation (AR -> WebRTC)
+            batch = [await self.outgoing_annotations.get()]
+            
+            if self.batch_annotations:
+                # Collect co-arriving annotations for up to batch_window
+                self._drain_outgoing(batch)
+                if len(batch) < self.max_batch_size and self.batch_window > 0:
+                    await asyncio.sleep(self.batch_window)
+                    self._drain_outgoing(batch)
+            
             try:
-                # Process outgoing annotations (AR -> WebRTC)
-                while not self.outgoing_annotations.empty():
-                    annotation = self.outgoing_annotations.get()
-                    await self.send_annotation_to_webrtc(annotation)
-                
-                # Small delay to prevent excessive CPU usage
-                await asyncio.sleep(0.01)  # 10ms
-                
+                if len(batch) == 1:
+                    await self.send_annotation_to_webrtc(batch[0])
+                else:
+                    await self.send_annotation_batch_to_webrtc(batch)
             except Exception as e:
                 self.logger.error(f"Error processing annotation queues: {e}")
-                await asyncio.sleep(1)
+            finally:
+                for _ in batch:
+                    self.outgoing_annotations.task_done()
+    
+    def _drain_outgoing(self, batch: List[Dict[str, Any]]):
+        """Move queued outgoing annotations into batch, up to max_batch_size"""
+        while len(batch) < self.max_batch_size and not self.outgoing_annotations.empty():
+            batch.append(self.outgoing_annotations.get_nowait())
     
     async def monitor_performance(self):
         """Monitor and log performance statistics"""
@@ -378,25 +567,26 @@ class WebRTCARBridge:
                 f"Uptime={uptime:.1f}s, "
                 f"Sent={self.stats['annotations_sent']}, "
                 f"Received={self.stats['annotations_received']}, "
-                f"AR_Clients={len(self.ar_clients)}, "
+                f"AR_Clients={len(self._ar_ws)}, "
                 f"Doctor={self.doctor_connected}, "
                 f"FieldMedic={self.field_medic_connected}"
             )
     
-    def get_stats(self) -> Dict[str, Any]:
-        """Get current statistics"""
-        uptime = time.time() - self.stats['start_time']
+    def get_stats(self) -> Mapping[str, Any]:
+        """Get current statistics as a read-only view
         
-        return {
-            **self.stats,
-            'connection_uptime': uptime,
-            'ar_clients_count': len(self.ar_clients),
-            'doctor_connected': self.doctor_connected,
-            'field_medic_connected': self.field_medic_connected,
-            'room_id': self.current_room_id,
-            'ar_session_id': self.ar_session_id,
-            'is_running': self.is_running
-        }
+        The view is refreshed on every call; copy it with dict() to keep a snapshot.
+        """
+        view = self._stats_view
+        view.update(self.stats)
+        view['connection_uptime'] = time.time() - self.stats['start_time']
+        view['ar_clients_count'] = len(self._ar_ws)
+        view['doctor_connected'] = self.doctor_connected
+        view['field_medic_connected'] = self.field_medic_connected
+        view['room_id'] = self.current_room_id
+        view['ar_session_id'] = self.ar_session_id
+        view['is_running'] = self.is_running
+        return self._stats_proxy
     
     async def stop(self):
         """Stop the bridge service"""
@@ -407,14 +597,15 @@ class WebRTCARBridge:
         if self.webrtc_client:
             await self.webrtc_client.disconnect()
         
-        # Close AR WebSocket connections
-        for client_id, websocket in list(self.ar_clients.items()):
-            try:
-                await websocket.close()
-            except:
-                pass
+        # Close AR WebSocket connections concurrently
+        await asyncio.gather(
+            *[websocket.close() for websocket in self._ar_ws],
+            return_exceptions=True
+        )
         
-        self.ar_clients.clear()
+        self._ar_ids.clear()
+        self._ar_ws.clear()
+        self._ar_index.clear()
         self.logger.info("Bridge service stopped")
 
 
@@ -430,6 +621,8 @@ async def main():
                        help='WebRTC server URL')
     parser.add_argument('--ar-port', type=int, default=8765, 
                        help='WebSocket port for AR clients')
+    parser.add_argument('--batch-annotations', action='store_true',
+                       help="Coalesce outgoing annotations into 'ar-annotation-add-batch' events")
     parser.add_argument('--log-level', default='INFO', 
                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
                        help='Logging level')
@@ -443,7 +636,8 @@ async def main():
     bridge = WebRTCARBridge(
         webrtc_server_url=args.webrtc_url,
         ar_ws_port=args.ar_port,
-        auth_token=args.auth_token
+        auth_token=args.auth_token,
+        batch_annotations=args.batch_annotations
     )
     
     try:
@@ -466,6 +660,8 @@ async def main():
 
 if __name__ == '__main__':
     # Run the bridge service
+    if UVLOOP_AVAILABLE:
+        uvloop.install()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
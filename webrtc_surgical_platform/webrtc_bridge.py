@@ -2,59 +2,175 @@
 """
 WebRTC-AR Bridge Service
 Connects WebRTC web platform with AR field medic systems
+
+All I/O runs on a single asyncio event loop; use loop.run_in_executor for any
+CPU-heavy work rather than starting threads.
 """
 
 import asyncio
-import websockets
-import json
-import requests
+import functools
+import orjson
 import logging
 import argparse
-from typing import Dict, Set
-import threading
+from typing import Dict, Iterable, List, Optional, Set
 import time
+from dataclasses import dataclass
 from aiohttp import web
 import aiohttp
 
+# Use uvloop's faster event loop when available
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
 # Load external configuration first
 from external_config import external_config
 
+# orjson for all JSON on the wire; payloads are decoded to str so AR and browser
+# clients keep receiving text frames
+def _dumps(obj) -> str:
+    """Encode obj to a JSON string"""
+    return orjson.dumps(obj).decode()
+
+_json_response = functools.partial(web.json_response, dumps=_dumps)
+
+# Shared response headers; aiohttp copies them into each response
+_CORS = {'Access-Control-Allow-Origin': '*'}
+_CORS_PREFLIGHT = {
+    **_CORS,
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+}
+
+# Fixed-shape messages sent to AR clients; only the %b leaves are encoded per send
+_START_CALL_TPL = b'{"type":"start_video_call","roomId":%b,"surgeonId":%b,"timestamp":%b}'
+_END_CALL_TPL = b'{"type":"end_video_call","roomId":%b,"surgeonId":%b,"timestamp":%b}'
+_ANNOTATION_RECEIVED_TPL = b'{"type":"annotation_received","annotation":%b,"source":"peer"}'
+
+def _render(template: bytes, *values) -> str:
+    """Fill a message template with JSON-encoded values"""
+    return (template % tuple(map(orjson.dumps, values))).decode()
+
+# Leading bytes of a video_frame message whose type key comes first (json.dumps
+# and compact encoders); such frames are forwarded without being parsed
+_VIDEO_FRAME_PREFIXES = ('{"type": "video_frame"', '{"type":"video_frame"')
+_VIDEO_FRAME_PREFIXES_B = tuple(p.encode() for p in _VIDEO_FRAME_PREFIXES)
+
+# How far into a raw video_frame message to look for its roomId
+_ROOM_ID_SCAN = 256
+
+def _embedded_room_id(message) -> Optional[str]:
+    """Find the roomId near the start of an undecoded video_frame message
+    
+    Returns None when it isn't a plain string within the first _ROOM_ID_SCAN
+    characters; such messages take the parsed path instead.
+    """
+    head = message[:_ROOM_ID_SCAN]
+    if isinstance(head, bytes):
+        head = head.decode('utf-8', 'ignore')
+    
+    key = head.find('"roomId"')
+    if key < 0:
+        return None
+    rest = head[key + len('"roomId"'):].lstrip()
+    if not rest.startswith(':'):
+        return None
+    rest = rest[1:].lstrip()
+    end = rest.find('"', 1)
+    if not rest.startswith('"') or end < 0:
+        return None
+    room_id = rest[1:end]
+    # Escaped ids are left to the JSON decoder
+    return None if '\\' in room_id else room_id
+
+# video_frame notifications are coalesced for up to 10 ms, at most 32 per batch.
+# A video_frame_batch is a JSON array of the AR clients' video_frame messages
+# exactly as sent ({"type":"video_frame","roomId":...,"frameData":...,"timestamp":...})
+_NOTIFY_FLUSH_DELAY = 0.01
+_NOTIFY_MAX_BATCH = 32
+
+# How long an encoded /health response is reused, in seconds
+_HEALTH_CACHE_TTL = 1.0
+
+# Upper bound for one AR message (base64 JPEG frames up to 1080p fit comfortably)
+_MAX_MESSAGE_SIZE = 4 * 2**20
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@dataclass(slots=True)
+class CallState:
+    """State of an active video call in one room"""
+    surgeon_id: Optional[str]
+    start_time: float  # time.monotonic() at call start
+    ar_ready: bool = False
+    status: str = 'starting'
+
 class WebRTCARBridge:
     def __init__(self, webrtc_url: str, ar_port: int = 8765, http_port: int = 8766):
         self.webrtc_url = webrtc_url
         self.ar_port = ar_port
         self.http_port = http_port
-        self.ar_clients: Set[websockets.WebSocketServerProtocol] = set()
-        self.room_connections: Dict[str, Set[websockets.WebSocketServerProtocol]] = {}
-        self.active_video_calls: Dict[str, Dict] = {}
+        # Each connected AR client with the rooms it joined, so disconnect only
+        # touches those rooms
+        self.ar_clients: Dict[web.WebSocketResponse, Set[str]] = {}
+        # Room members as plain lists: broadcasts iterate them on every message
+        self.room_connections: Dict[str, List[web.WebSocketResponse]] = {}
+        self.active_video_calls: Dict[str, CallState] = {}
+        # video_frame events waiting for the next coalesced notification
+        self._pending_frames: List = []
+        self._flush_handle: asyncio.TimerHandle = None
+        self._flush_tasks: Set[asyncio.Task] = set()
+        # (monotonic time, encoded body) of the last /health response
+        self._health_cache = (float('-inf'), b'')
+        # Shared client session for calls to the WebRTC platform, created on first use
+        self.http_session: aiohttp.ClientSession = None
         
-    async def register_ar_client(self, websocket, path):
+    async def register_ar_client(self, request):
         """Handle AR client connections"""
+        websocket = web.WebSocketResponse(
+            heartbeat=20,
+            # Frames carry already-compressed JPEG data, so permessage-deflate only costs CPU
+            compress=False,
+            max_msg_size=_MAX_MESSAGE_SIZE
+        )
+        await websocket.prepare(request)
+        
         try:
-            logger.info(f"AR client connected from {websocket.remote_address}")
-            self.ar_clients.add(websocket)
+            logger.info(f"AR client connected from {request.remote}")
+            self.ar_clients[websocket] = set()
             
-            async for message in websocket:
+            async for msg in websocket:
+                if msg.type not in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                    break
+                
+                message = msg.data
+                prefixes = _VIDEO_FRAME_PREFIXES if isinstance(message, str) else _VIDEO_FRAME_PREFIXES_B
+                if message.startswith(prefixes):
+                    room_id = _embedded_room_id(message)
+                    if room_id is not None:
+                        self.forward_video_frame_raw(room_id, message)
+                        continue
+                
                 try:
-                    data = json.loads(message)
+                    data = orjson.loads(message)
                     await self.handle_ar_message(websocket, data)
-                except json.JSONDecodeError as e:
+                except orjson.JSONDecodeError as e:
                     logger.error(f"Invalid JSON from AR client: {e}")
                 except Exception as e:
                     logger.error(f"Error handling AR message: {e}")
                     
-        except websockets.exceptions.ConnectionClosed:
             logger.info("AR client disconnected")
         except Exception as e:
             logger.error(f"AR client error: {e}")
         finally:
-            self.ar_clients.discard(websocket)
-            # Remove from room connections
-            for room_id, clients in self.room_connections.items():
-                clients.discard(websocket)
+            # Remove from the rooms this client joined
+            for room_id in self.ar_clients.pop(websocket, ()):
+                self.room_connections[room_id].remove(websocket)
+        
+        return websocket
     
     async def handle_ar_message(self, websocket, data):
         """Process messages from AR clients"""
@@ -63,9 +179,10 @@ class WebRTCARBridge:
         if message_type == 'join_room':
             room_id = data.get('roomId')
             if room_id:
-                if room_id not in self.room_connections:
-                    self.room_connections[room_id] = set()
-                self.room_connections[room_id].add(websocket)
+                joined_rooms = self.ar_clients[websocket]
+                if room_id not in joined_rooms:
+                    joined_rooms.add(room_id)
+                    self.room_connections.setdefault(room_id, []).append(websocket)
                 
                 # Notify WebRTC platform of AR client joining
                 await self.notify_webrtc_platform('ar_client_joined', {
@@ -87,22 +204,38 @@ class WebRTCARBridge:
                 })
                 
                 # Forward to other AR clients in the same room
-                for client in self.room_connections[room_id]:
-                    if client != websocket:
-                        try:
-                            await client.send(json.dumps({
-                                'type': 'annotation_received',
-                                'annotation': data.get('annotation'),
-                                'source': 'peer'
-                            }))
-                        except:
-                            pass
+                recipients = self.room_peers(room_id, websocket)
+                if recipients:
+                    await self.broadcast(
+                        recipients, _render(_ANNOTATION_RECEIVED_TPL, data.get('annotation'))
+                    )
+        
+        elif message_type == 'annotation_batch':
+            room_id = data.get('roomId')
+            if room_id and room_id in self.room_connections:
+                # Resolve the room's peers once for the whole batch
+                peers = self.room_peers(room_id, websocket)
+                
+                for item in data.get('annotations', []):
+                    # Forward annotation to WebRTC platform
+                    await self.notify_webrtc_platform('ar_annotation', {
+                        'roomId': room_id,
+                        'annotation': item.get('annotation'),
+                        'timestamp': item.get('timestamp', data.get('timestamp')),
+                        'source': 'ar_field_medic'
+                    })
+                    
+                    # Forward to other AR clients in the same room
+                    if peers:
+                        await self.broadcast(
+                            peers, _render(_ANNOTATION_RECEIVED_TPL, item.get('annotation'))
+                        )
         
         elif message_type == 'video_call_started':
             # AR client confirmed video call start
             room_id = data.get('roomId')
             if room_id and room_id in self.active_video_calls:
-                self.active_video_calls[room_id]['ar_ready'] = True
+                self.active_video_calls[room_id].ar_ready = True
                 logger.info(f"AR client ready for video call in room {room_id}")
         
         elif message_type == 'video_call_ended':
@@ -116,14 +249,104 @@ class WebRTCARBridge:
             # Forward video frame to WebRTC platform (if needed)
             room_id = data.get('roomId')
             if room_id and room_id in self.active_video_calls:
-                await self.notify_webrtc_platform('video_frame', {
-                    'roomId': room_id,
-                    'frameData': data.get('frameData'),
-                    'timestamp': data.get('timestamp')
-                })
+                # Same shape as the raw path: the client's message as sent
+                self.queue_frame_notification(data)
+        
+        # Control operations, also served over HTTP; the backend can send these
+        # over the AR socket instead of opening HTTP requests
+        elif message_type == 'start_video_call':
+            result = await self.start_video_call(data.get('roomId'), data.get('surgeonId'))
+            await self.send_control_response(websocket, message_type, result)
+        
+        elif message_type == 'end_video_call':
+            result = await self.end_video_call(data.get('roomId'), data.get('surgeonId'))
+            await self.send_control_response(websocket, message_type, result)
+        
+        elif message_type == 'video_call_status':
+            await self.send_control_response(websocket, message_type, self.video_call_status(data.get('roomId')))
+        
+        elif message_type == 'health':
+            await self.send_control_response(websocket, message_type, self.health_status())
+    
+    async def send_control_response(self, websocket, message_type: str, result: dict):
+        """Reply to a WebSocket control message"""
+        await websocket.send_str(_dumps({'type': f'{message_type}_response', **result}))
+    
+    def room_peers(self, room_id: str, websocket) -> list:
+        """Members of a room other than websocket, resolved once per fan-out"""
+        clients = self.room_connections[room_id]
+        if room_id not in self.ar_clients.get(websocket, ()):
+            # Sender isn't a member; the room list can be used as-is
+            return clients
+        
+        # Splice the sender out around its index instead of comparing every member
+        i = clients.index(websocket)
+        return clients[:i] + clients[i + 1:]
+    
+    def forward_video_frame_raw(self, room_id: str, message):
+        """Forward a video_frame message for room_id to the WebRTC platform without decoding it"""
+        # Same gate as the parsed path: the frame's own room must have a call
+        if room_id in self.active_video_calls:
+            self.queue_frame_notification(message)
     
-    async def notify_webrtc_platform(self, event_type: str, data: dict):
-        """Send events to WebRTC platform"""
+    def queue_frame_notification(self, event):
+        """Queue a video_frame event for the next coalesced platform notification
+        
+        event is a video_frame message, either decoded (dict) or raw (str/bytes).
+        """
+        self._pending_frames.append(event)
+        
+        if len(self._pending_frames) >= _NOTIFY_MAX_BATCH:
+            # Full batch: flush now instead of waiting for the timer
+            if self._flush_handle:
+                self._flush_handle.cancel()
+            self._schedule_frame_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                _NOTIFY_FLUSH_DELAY, self._schedule_frame_flush
+            )
+    
+    def _schedule_frame_flush(self):
+        """Hand the pending frames to a flush task"""
+        self._flush_handle = None
+        batch, self._pending_frames = self._pending_frames, []
+        if batch:
+            task = asyncio.ensure_future(self._flush_frame_notifications(batch))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+    
+    async def _flush_frame_notifications(self, batch):
+        """Send a batch of video_frame events to the platform in one notification"""
+        parts = [b'[']
+        for event in batch:
+            if len(parts) > 1:
+                parts.append(b',')
+            if isinstance(event, dict):
+                parts.append(orjson.dumps(event))
+            else:
+                # Text frames need their one encode here; binary frames go in as-is
+                parts.append(event.encode() if isinstance(event, str) else event)
+        parts.append(b']')
+        # One join builds the whole body
+        await self.notify_webrtc_platform('video_frame_batch', b''.join(parts))
+    
+    async def drain_frame_notifications(self):
+        """Flush pending video_frame events and wait for in-flight batches"""
+        if self._flush_handle:
+            self._flush_handle.cancel()
+        pending = len(self._pending_frames)
+        self._schedule_frame_flush()
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        if pending:
+            logger.info(f"Flushed {pending} pending video frame(s) on shutdown")
+    
+    async def notify_webrtc_platform(self, event_type: str, data):
+        """Send events to WebRTC platform
+        
+        data is either an event dict or an already-encoded event (bytes-like)
+        that is passed through untouched.
+        """
         try:
             # Use HTTP POST to notify the WebRTC platform
             payload = {
@@ -133,32 +356,25 @@ class WebRTCARBridge:
             
             # For now, just log the notification
             # In a full implementation, this would send to the WebRTC signaling server
-            logger.info(f"Notifying WebRTC platform: {event_type} - {data}")
+            summary = data if isinstance(data, dict) else f"{len(data)} bytes (raw)"
+            logger.info(f"Notifying WebRTC platform: {event_type} - {summary}")
             
         except Exception as e:
             logger.error(f"Error notifying WebRTC platform: {e}")
     
-    async def start_ar_websocket_server(self):
-        """Start WebSocket server for AR clients"""
-        logger.info(f"Starting AR WebSocket server on port {self.ar_port}")
-        
-        # Create a wrapper function that provides the path parameter
-        async def websocket_handler(websocket):
-            await self.register_ar_client(websocket, "/")
-        
-        server = await websockets.serve(
-            websocket_handler,
-            "0.0.0.0",
-            self.ar_port,
-            ping_interval=20,
-            ping_timeout=10
+    async def broadcast(self, clients: Iterable[web.WebSocketResponse], payload: str):
+        """Send one encoded message to several AR clients"""
+        # Overlap the writes so one slow client doesn't hold up the rest
+        results = await asyncio.gather(
+            *[client.send_str(payload) for client in clients if not client.closed],
+            return_exceptions=True
         )
-        
-        logger.info(f"AR WebSocket server started on port {self.ar_port}")
-        return server
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Failed to send to AR client: {result}")
     
     async def setup_http_server(self):
-        """Setup HTTP server for receiving commands from backend"""
+        """Setup the aiohttp app serving both the HTTP API and the AR WebSocket"""
         app = web.Application()
         
         # Add routes for video call control
@@ -167,181 +383,187 @@ class WebRTCARBridge:
         app.router.add_get('/video-call/status/{room_id}', self.handle_video_call_status)
         app.router.add_get('/health', self.handle_health_check)
         
-        # Enable CORS
-        app.router.add_options('/{path:.*}', self.handle_cors_preflight)
+        # Enable CORS on the API routes (a catch-all would turn unknown paths into 405s)
+        for path in ('/video-call/start', '/video-call/end', '/video-call/status/{room_id}', '/health'):
+            app.router.add_options(path, self.handle_cors_preflight)
+        
+        # AR clients connect to ws://host:<ar_port>/; /ar is accepted as an alias.
+        # Other GET paths fall through to aiohttp's 404
+        for path in ('/', '/ar'):
+            app.router.add_get(path, self.register_ar_client)
         
         return app
     
     async def handle_cors_preflight(self, request):
         """Handle CORS preflight requests"""
-        return web.Response(
-            headers={
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+        return web.Response(headers=_CORS_PREFLIGHT)
+    
+    async def start_video_call(self, room_id: str, surgeon_id: str = None) -> dict:
+        """Start a video call in a room and tell its AR clients"""
+        if not room_id:
+            return {'success': False, 'error': 'Room ID required'}
+        
+        # Track video call
+        self.active_video_calls[room_id] = CallState(surgeon_id=surgeon_id, start_time=time.monotonic())
+        
+        # Send start command to AR clients in the room
+        if room_id in self.room_connections:
+            # Encode once and write the same frame to every client in the room
+            clients = self.room_connections[room_id]
+            await self.broadcast(clients, _render(_START_CALL_TPL, room_id, surgeon_id, time.time()))
+            logger.info(f"Sent start video call command to {len(clients)} AR client(s) in room {room_id}")
+        
+        return {
+            'success': True,
+            'message': 'Video call start command sent',
+            'roomId': room_id,
+            'status': 'starting'
+        }
+    
+    async def end_video_call(self, room_id: str, surgeon_id: str = None) -> dict:
+        """End a video call in a room and tell its AR clients"""
+        if not room_id:
+            return {'success': False, 'error': 'Room ID required'}
+        
+        # Send end command to AR clients in the room
+        if room_id in self.room_connections:
+            # Encode once and write the same frame to every client in the room
+            clients = self.room_connections[room_id]
+            await self.broadcast(clients, _render(_END_CALL_TPL, room_id, surgeon_id, time.time()))
+            logger.info(f"Sent end video call command to {len(clients)} AR client(s) in room {room_id}")
+        
+        # Remove from active calls
+        if room_id in self.active_video_calls:
+            call_info = self.active_video_calls[room_id]
+            del self.active_video_calls[room_id]
+            
+            return {
+                'success': True,
+                'message': 'Video call ended',
+                'roomId': room_id,
+                'duration': time.monotonic() - call_info.start_time
             }
-        )
+        else:
+            return {
+                'success': True,
+                'message': 'No active video call found for room',
+                'roomId': room_id
+            }
+    
+    def video_call_status(self, room_id: str) -> dict:
+        """Current video call status for a room"""
+        if room_id in self.active_video_calls:
+            call_info = self.active_video_calls[room_id]
+            return {
+                'success': True,
+                'roomId': room_id,
+                'status': call_info.status,
+                'isActive': True,
+                'arReady': call_info.ar_ready,
+                'duration': time.monotonic() - call_info.start_time
+            }
+        else:
+            return {
+                'success': True,
+                'roomId': room_id,
+                'status': 'inactive',
+                'isActive': False
+            }
+    
+    def health_status(self) -> dict:
+        """Bridge health summary"""
+        return {
+            'success': True,
+            'status': 'operational',
+            'arClients': len(self.ar_clients),
+            'activeRooms': len(self.room_connections),
+            'activeCalls': len(self.active_video_calls),
+            'timestamp': time.time()
+        }
     
     async def handle_start_video_call_http(self, request):
         """HTTP endpoint to start video call"""
         try:
-            data = await request.json()
-            room_id = data.get('roomId')
-            surgeon_id = data.get('surgeonId')
+            data = await request.json(loads=orjson.loads)
+            result = await self.start_video_call(data.get('roomId'), data.get('surgeonId'))
             
-            if not room_id:
-                return web.json_response(
-                    {'success': False, 'error': 'Room ID required'}, 
-                    status=400
-                )
+            if not result['success']:
+                return _json_response(result, status=400)
             
-            # Track video call
-            self.active_video_calls[room_id] = {
-                'surgeon_id': surgeon_id,
-                'start_time': time.time(),
-                'ar_ready': False,
-                'status': 'starting'
-            }
-            
-            # Send start command to AR clients in the room
-            if room_id in self.room_connections:
-                message = {
-                    'type': 'start_video_call',
-                    'roomId': room_id,
-                    'surgeonId': surgeon_id,
-                    'timestamp': time.time()
-                }
-                
-                for client in self.room_connections[room_id]:
-                    try:
-                        await client.send(json.dumps(message))
-                        logger.info(f"Sent start video call command to AR client in room {room_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to send start command to AR client: {e}")
-            
-            return web.json_response({
-                'success': True,
-                'message': 'Video call start command sent',
-                'roomId': room_id,
-                'status': 'starting'
-            }, headers={'Access-Control-Allow-Origin': '*'})
+            return _json_response(result, headers=_CORS)
             
         except Exception as e:
             logger.error(f"Error starting video call: {e}")
-            return web.json_response(
+            return _json_response(
                 {'success': False, 'error': str(e)},
                 status=500,
-                headers={'Access-Control-Allow-Origin': '*'}
+                headers=_CORS
             )
     
     async def handle_end_video_call_http(self, request):
         """HTTP endpoint to end video call"""
         try:
-            data = await request.json()
-            room_id = data.get('roomId')
-            surgeon_id = data.get('surgeonId')
+            data = await request.json(loads=orjson.loads)
+            result = await self.end_video_call(data.get('roomId'), data.get('surgeonId'))
             
-            if not room_id:
-                return web.json_response(
-                    {'success': False, 'error': 'Room ID required'},
-                    status=400
-                )
+            if not result['success']:
+                return _json_response(result, status=400)
             
-            # Send end command to AR clients in the room
-            if room_id in self.room_connections:
-                message = {
-                    'type': 'end_video_call',
-                    'roomId': room_id,
-                    'surgeonId': surgeon_id,
-                    'timestamp': time.time()
-                }
-                
-                for client in self.room_connections[room_id]:
-                    try:
-                        await client.send(json.dumps(message))
-                        logger.info(f"Sent end video call command to AR client in room {room_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to send end command to AR client: {e}")
-            
-            # Remove from active calls
-            if room_id in self.active_video_calls:
-                call_info = self.active_video_calls[room_id]
-                del self.active_video_calls[room_id]
-                
-                return web.json_response({
-                    'success': True,
-                    'message': 'Video call ended',
-                    'roomId': room_id,
-                    'duration': time.time() - call_info.get('start_time', 0)
-                }, headers={'Access-Control-Allow-Origin': '*'})
-            else:
-                return web.json_response({
-                    'success': True,
-                    'message': 'No active video call found for room',
-                    'roomId': room_id
-                }, headers={'Access-Control-Allow-Origin': '*'})
+            return _json_response(result, headers=_CORS)
             
         except Exception as e:
             logger.error(f"Error ending video call: {e}")
-            return web.json_response(
+            return _json_response(
                 {'success': False, 'error': str(e)},
                 status=500,
-                headers={'Access-Control-Allow-Origin': '*'}
+                headers=_CORS
             )
     
     async def handle_video_call_status(self, request):
         """HTTP endpoint to get video call status"""
         try:
             room_id = request.match_info['room_id']
-            
-            if room_id in self.active_video_calls:
-                call_info = self.active_video_calls[room_id]
-                return web.json_response({
-                    'success': True,
-                    'roomId': room_id,
-                    'status': call_info.get('status', 'active'),
-                    'isActive': True,
-                    'arReady': call_info.get('ar_ready', False),
-                    'duration': time.time() - call_info.get('start_time', 0)
-                }, headers={'Access-Control-Allow-Origin': '*'})
-            else:
-                return web.json_response({
-                    'success': True,
-                    'roomId': room_id,
-                    'status': 'inactive',
-                    'isActive': False
-                }, headers={'Access-Control-Allow-Origin': '*'})
+            return _json_response(
+                self.video_call_status(room_id),
+                headers=_CORS
+            )
                 
         except Exception as e:
             logger.error(f"Error getting video call status: {e}")
-            return web.json_response(
+            return _json_response(
                 {'success': False, 'error': str(e)},
                 status=500,
-                headers={'Access-Control-Allow-Origin': '*'}
+                headers=_CORS
             )
     
     async def handle_health_check(self, request):
         """Health check endpoint"""
-        return web.json_response({
-            'success': True,
-            'status': 'operational',
-            'arClients': len(self.ar_clients),
-            'activeRooms': len(self.room_connections),
-            'activeCalls': len(self.active_video_calls),
-            'timestamp': time.time()
-        }, headers={'Access-Control-Allow-Origin': '*'})
+        # Liveness probes poll this; serve the encoded body for up to a second
+        now = time.monotonic()
+        cached_at, body = self._health_cache
+        if now - cached_at >= _HEALTH_CACHE_TTL:
+            body = orjson.dumps(self.health_status())
+            self._health_cache = (now, body)
+        
+        return web.Response(body=body, content_type='application/json', headers=_CORS)
+    
+    def get_http_session(self) -> aiohttp.ClientSession:
+        """Shared aiohttp session for requests to the WebRTC platform"""
+        if self.http_session is None or self.http_session.closed:
+            self.http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=2))
+        return self.http_session
     
-    def test_webrtc_connection(self, room_id: str):
+    async def test_webrtc_connection(self, room_id: str):
         """Test connection to WebRTC platform"""
         try:
             # Test room exists
-            response = requests.get(f"{self.webrtc_url}/api/rooms/{room_id}")
-            if response.status_code == 200:
-                logger.info(f"✅ Room {room_id} exists and is accessible")
-                return True
-            else:
-                logger.warning(f"❌ Room {room_id} not found or inaccessible")
-                return False
+            async with self.get_http_session().get(f"{self.webrtc_url}/api/rooms/{room_id}") as response:
+                if response.status == 200:
+                    logger.info(f"✅ Room {room_id} exists and is accessible")
+                    return True
+                else:
+                    logger.warning(f"❌ Room {room_id} not found or inaccessible")
+                    return False
         except Exception as e:
             logger.error(f"❌ Error testing WebRTC connection: {e}")
             return False
@@ -350,22 +572,27 @@ class WebRTCARBridge:
         """Start the bridge service"""
         logger.info("🚀 Starting WebRTC-AR Bridge Service")
         
-        # Test WebRTC platform connection if room provided
-        if test_room_id:
-            if self.test_webrtc_connection(test_room_id):
-                logger.info(f"✅ Bridge ready for room: {test_room_id}")
-            else:
-                logger.warning("⚠️  WebRTC platform test failed, but continuing...")
-        
-        # Start HTTP server for backend communication
+        # One aiohttp app serves the HTTP API and the AR WebSocket; it listens on
+        # both ports so existing AR and backend URLs keep working
         app = await self.setup_http_server()
         http_runner = web.AppRunner(app)
         await http_runner.setup()
-        http_site = web.TCPSite(http_runner, '0.0.0.0', self.http_port)
-        await http_site.start()
         
-        # Start AR WebSocket server
-        websocket_server = await self.start_ar_websocket_server()
+        # Bind the listeners and test the WebRTC platform (if a room was provided)
+        # concurrently; the platform test never blocks startup
+        room_check = None
+        async with asyncio.TaskGroup() as tg:
+            if test_room_id:
+                room_check = tg.create_task(self.test_webrtc_connection(test_room_id))
+            for port in sorted({self.http_port, self.ar_port}):
+                tg.create_task(web.TCPSite(http_runner, '0.0.0.0', port).start())
+        logger.info(f"AR WebSocket and HTTP API listening on ports {self.ar_port}/{self.http_port}")
+        
+        if room_check:
+            if room_check.result():
+                logger.info(f"✅ Bridge ready for room: {test_room_id}")
+            else:
+                logger.warning("⚠️  WebRTC platform test failed, but continuing...")
         
         logger.info("🔄 Bridge service running - waiting for connections...")
         mode = external_config.get_display_info()['mode']
@@ -380,13 +607,16 @@ class WebRTCARBridge:
         logger.info(f"   WebRTC platform at: {self.webrtc_url}")
         
         try:
-            # Keep both servers running
-            await websocket_server.wait_closed()
-        except KeyboardInterrupt:
+            # Keep the server running until cancelled
+            await asyncio.Future()
+        except (KeyboardInterrupt, asyncio.CancelledError):
             logger.info("🛑 Bridge service shutting down...")
-            websocket_server.close()
-            await websocket_server.wait_closed()
             await http_runner.cleanup()
+            raise
+        finally:
+            await self.drain_frame_notifications()
+            if self.http_session:
+                await self.http_session.close()
 
 async def main():
     parser = argparse.ArgumentParser(description='WebRTC-AR Bridge Service')
@@ -412,4 +642,6 @@ async def main():
     await bridge.run(test_room_id=args.room_id)
 
 if __name__ == "__main__":
+    if UVLOOP_AVAILABLE:
+        uvloop.install()
     asyncio.run(main())
\ No newline at end of file